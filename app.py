@@ -5,12 +5,14 @@ Main UI interface for the Bill-Only Reconciliation Engine.
 
 import streamlit as st
 import pandas as pd
+import hashlib
+import io
 import os
 from datetime import datetime
 
 # Import custom modules
 from reconciliation_engine import ReconciliationEngine
-from utils import format_currency
+from utils import format_currency, read_csv
 from config import (
     APP_NAME,
     APP_VERSION,
@@ -33,6 +35,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# --- Cached Helpers ---
+@st.cache_data(show_spinner=False)
+def load_csv(path_or_bytes) -> pd.DataFrame:
+    """Read a CSV from a file path or raw uploaded bytes, cached on its input."""
+    if isinstance(path_or_bytes, bytes):
+        return read_csv(io.BytesIO(path_or_bytes))
+    return read_csv(path_or_bytes)
+
+
+@st.cache_data(show_spinner=False)
+def run_reconcile(df_inv: pd.DataFrame, df_clin: pd.DataFrame, threshold: int) -> pd.DataFrame:
+    """Run the reconciliation engine, cached on input data and threshold."""
+    return ReconciliationEngine(match_threshold=threshold).reconcile(df_inv, df_clin)
+
+
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(cache_key: tuple, _df: pd.DataFrame, index: bool = False) -> bytes:
+    """Encode a DataFrame as UTF-8 CSV bytes, cached on cache_key (_df is not hashed)."""
+    return _df.to_csv(index=index).encode('utf-8')
+
+
 # --- Custom CSS ---
 st.markdown("""
 <style>
@@ -134,8 +157,8 @@ with col1:
     if sample_data_exists:
         if st.button("🚀 Load Demo Dataset", type="primary", use_container_width=True):
             try:
-                st.session_state.df_inv = pd.read_csv(SAMPLE_INVOICE_PATH)
-                st.session_state.df_clin = pd.read_csv(SAMPLE_CLINICAL_PATH)
+                st.session_state.df_inv = load_csv(SAMPLE_INVOICE_PATH)
+                st.session_state.df_clin = load_csv(SAMPLE_CLINICAL_PATH)
                 st.session_state.data_loaded = True
                 st.success("✅ Sample data loaded successfully!")
             except Exception as e:
@@ -150,8 +173,8 @@ with col2:
 
     if uploaded_inv and uploaded_clin:
         try:
-            st.session_state.df_inv = pd.read_csv(uploaded_inv)
-            st.session_state.df_clin = pd.read_csv(uploaded_clin)
+            st.session_state.df_inv = load_csv(uploaded_inv.getvalue())
+            st.session_state.df_clin = load_csv(uploaded_clin.getvalue())
             st.session_state.data_loaded = True
             st.success("✅ Custom data uploaded successfully!")
         except Exception as e:
@@ -190,14 +213,11 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
     # --- Run Reconciliation Engine ---
     with st.spinner("🔍 Running Reconciliation Engine..."):
         try:
-            # Initialize engine with user-selected threshold
-            engine = ReconciliationEngine(match_threshold=match_threshold)
-
-            # Perform reconciliation
-            df_results = engine.reconcile(df_inv, df_clin)
+            # Perform reconciliation with user-selected threshold
+            df_results = run_reconcile(df_inv, df_clin, match_threshold)
 
             # Generate summary statistics
-            summary_stats = engine.generate_summary_stats(df_results)
+            summary_stats = ReconciliationEngine(match_threshold=match_threshold).generate_summary_stats(df_results)
 
             st.success("✅ Reconciliation complete!")
 
@@ -215,13 +235,17 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
         horizontal=True
     )
 
+    # Partition results by risk level once for filtering and exports
+    risk_groups = dict(tuple(df_results.groupby('Risk_Level', observed=True)))
+    empty_df = df_results.iloc[0:0]
+
     # Apply Filter
     if filter_option == "High Risk Only":
-        display_df = df_results[df_results['Risk_Level'] == RISK_LEVELS["HIGH"]]
+        display_df = risk_groups.get(RISK_LEVELS["HIGH"], empty_df)
     elif filter_option == "Review Required":
-        display_df = df_results[df_results['Risk_Level'] == RISK_LEVELS["MEDIUM"]]
+        display_df = risk_groups.get(RISK_LEVELS["MEDIUM"], empty_df)
     elif filter_option == "Matched Items":
-        display_df = df_results[df_results['Risk_Level'] == RISK_LEVELS["LOW"]]
+        display_df = risk_groups.get(RISK_LEVELS["LOW"], empty_df)
     else:
         display_df = df_results
 
@@ -230,7 +254,11 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
 
     # Display Dataframe
     st.dataframe(
-        display_df[['PO_Number', 'Vendor_Item', 'Clinical_Match', 'Confidence_Score', 'Unit_Cost', 'Status']],
+        display_df[['PO_Number', 'Vendor_Item', 'Clinical_Match', 'Confidence_Score_Numeric', 'Cost_At_Risk', 'Status']],
+        column_config={
+            'Confidence_Score_Numeric': st.column_config.NumberColumn('Confidence_Score', format='%d%%'),
+            'Cost_At_Risk': st.column_config.NumberColumn('Unit_Cost', format='$%.2f')
+        },
         use_container_width=True,
         height=400
     )
@@ -272,10 +300,14 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
     st.markdown("---")
     st.header("4️⃣ Export Audit Report")
 
+    # Fingerprint the results once (row order included); each export is cached under this key
+    row_hashes = pd.util.hash_pandas_object(df_results, index=False).to_numpy()
+    results_key = hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        csv_data = df_results.to_csv(index=False).encode('utf-8')
+        csv_data = to_csv_bytes((results_key, "full"), df_results)
         timestamp = datetime.now().strftime(EXPORT_DATETIME_FORMAT)
         st.download_button(
             label="📥 Download Full Report (CSV)",
@@ -287,8 +319,8 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
         )
 
     with col2:
-        high_risk_df = df_results[df_results['Risk_Level'] == RISK_LEVELS["HIGH"]]
-        high_risk_csv = high_risk_df.to_csv(index=False).encode('utf-8')
+        high_risk_df = risk_groups.get(RISK_LEVELS["HIGH"], empty_df)
+        high_risk_csv = to_csv_bytes((results_key, RISK_LEVELS["HIGH"]), high_risk_df)
         st.download_button(
             label="⚠️ Download High-Risk Only",
             data=high_risk_csv,
@@ -300,7 +332,7 @@ if 'data_loaded' in st.session_state and st.session_state.data_loaded:
     with col3:
         # Export summary statistics
         summary_df = pd.DataFrame(summary_stats).T
-        summary_csv = summary_df.to_csv().encode('utf-8')
+        summary_csv = to_csv_bytes((results_key, "summary"), summary_df, index=True)
         st.download_button(
             label="📊 Download Summary Stats",
             data=summary_csv,
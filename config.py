@@ -12,6 +12,11 @@ APP_DESCRIPTION = "Automated Bill-Only Surgical Reconciliation Engine"
 DEFAULT_MATCH_THRESHOLD = 70
 HIGH_CONFIDENCE_THRESHOLD = 90
 REVIEW_THRESHOLD = 60
+SCORE_CUTOFF = REVIEW_THRESHOLD - 5  # Pairs below this are scored as 0
+BLOCKING_NGRAM_SIZE = 3  # Character n-gram length used as blocking keys
+BLOCKING_MIN_SHARED_NGRAMS = 2  # N-grams a clinical item must share to be a candidate
+BLOCKING_MAX_NGRAM_SHARE = 0.05  # N-grams in more of the catalog than this are ignored
+BLOCKING_MAX_CANDIDATES = 50  # Strongest-overlap candidates scored per vendor item
 
 # Risk Classification
 RISK_LEVELS = {
@@ -20,6 +25,13 @@ RISK_LEVELS = {
     "LOW": "Low"
 }
 
+# Status messages shown for each risk level
+RISK_STATUSES = {
+    "HIGH": "❌ REVENUE LEAKAGE",
+    "MEDIUM": "⚠️ Review Required",
+    "LOW": "✅ Match Found"
+}
+
 # File Paths
 SAMPLE_INVOICE_PATH = "vendor_invoice_data.csv"
 SAMPLE_CLINICAL_PATH = "clinical_logs_data.csv"
@@ -37,7 +49,8 @@ CLINICAL_COLUMNS = {
     "case_id": "Case_ID",
     "clinical_item": "Clinical_Item_Desc",
     "qty_used": "Qty_Used",
-    "implant_date": "Implant_Date"
+    "implant_date": "Implant_Date",
+    "po_ref": "PO_Ref_Optional"
 }
 
 # Output Settings
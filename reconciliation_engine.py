@@ -3,14 +3,25 @@ Core reconciliation engine for fuzzy matching and risk classification.
 This module contains the business logic for identifying revenue leakage.
 """
 
+import functools
+import os
+from collections import defaultdict
+import numpy as np
 import pandas as pd
-from thefuzz import process, fuzz
+from rapidfuzz import process, fuzz
+from rapidfuzz.utils import default_process
 from typing import List, Dict, Tuple
 import logging
-from utils import normalize_text, validate_dataframe
+from utils import validate_dataframe, read_csv
 from config import (
     HIGH_CONFIDENCE_THRESHOLD,
+    SCORE_CUTOFF,
+    BLOCKING_NGRAM_SIZE,
+    BLOCKING_MIN_SHARED_NGRAMS,
+    BLOCKING_MAX_NGRAM_SHARE,
+    BLOCKING_MAX_CANDIDATES,
     RISK_LEVELS,
+    RISK_STATUSES,
     INVOICE_COLUMNS,
     CLINICAL_COLUMNS
 )
@@ -19,6 +30,29 @@ from config import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Risk levels ordered by risk code (see ReconciliationEngine.classify_risk_codes)
+RISK_ORDER = ("HIGH", "MEDIUM", "LOW")
+
+
+def _char_ngrams(text: str, n: int = BLOCKING_NGRAM_SIZE) -> set:
+    """Character n-grams of each token; tokens shorter than n are kept whole."""
+    return {
+        token[i:i + n]
+        for token in text.split()
+        for i in range(max(len(token) - n + 1, 1))
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def _process_catalog(clinical_items: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Run a clinical catalog through default_process, cached on its contents.
+
+    Shared across engines, so changing the match threshold reuses the
+    processed catalog.
+    """
+    return tuple(default_process(item) for item in clinical_items)
+
 
 class ReconciliationEngine:
     """
@@ -26,14 +60,30 @@ class ReconciliationEngine:
     and clinical documentation to identify revenue leakage.
     """
 
-    def __init__(self, match_threshold: int = 70):
+    def __init__(
+        self,
+        match_threshold: int = 70,
+        scorer=fuzz.token_sort_ratio,
+        workers: int = -1,
+        blocking: bool = False
+    ):
         """
         Initialize the reconciliation engine.
 
         Args:
             match_threshold (int): Minimum confidence score for a match (0-100)
+            scorer: RapidFuzz scoring algorithm used for matching. The risk
+                thresholds are calibrated for token_sort_ratio; subset-based
+                scorers such as token_set_ratio score 100 on any contained
+                token set and are opt-in only.
+            workers (int): Threads used for batched scoring (-1 uses all cores)
+            blocking (bool): Only score clinical items sharing a character n-gram
+                with the vendor item. Opt-in for very large clinical catalogs.
         """
         self.match_threshold = match_threshold
+        self.scorer = scorer
+        self.workers = workers
+        self.blocking = blocking
         logger.info(f"ReconciliationEngine initialized with threshold: {match_threshold}")
 
 
@@ -47,19 +97,49 @@ class ReconciliationEngine:
         Returns:
             Tuple[str, str]: (status_message, risk_level)
         """
-        if match_score >= HIGH_CONFIDENCE_THRESHOLD:
-            return "✅ Match Found", RISK_LEVELS["LOW"]
-        elif match_score >= self.match_threshold:
-            return "⚠️ Review Required", RISK_LEVELS["MEDIUM"]
-        else:
-            return "❌ REVENUE LEAKAGE", RISK_LEVELS["HIGH"]
+        statuses, risk_levels = self.classify_risk_batch(np.array([match_score]))
+        return str(statuses[0]), str(risk_levels[0])
+
+
+    def classify_risk_codes(self, match_scores: np.ndarray) -> np.ndarray:
+        """
+        Bucket match scores into int8 risk codes in a single pass.
+
+        Codes index RISK_ORDER: 0 = HIGH, 1 = MEDIUM, 2 = LOW.
+
+        Args:
+            match_scores (np.ndarray): Confidence scores (0-100)
+
+        Returns:
+            np.ndarray: int8 risk code per score
+        """
+        # A threshold above HIGH_CONFIDENCE_THRESHOLD leaves the MEDIUM band empty
+        bins = [min(self.match_threshold, HIGH_CONFIDENCE_THRESHOLD), HIGH_CONFIDENCE_THRESHOLD]
+        return np.digitize(np.asarray(match_scores), bins).astype(np.int8)
+
+
+    def classify_risk_batch(self, match_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classify risk for an array of match confidence scores in one pass.
+
+        Args:
+            match_scores (np.ndarray): Confidence scores (0-100)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (status_messages, risk_levels)
+        """
+        codes = self.classify_risk_codes(match_scores)
+        statuses = np.array([RISK_STATUSES[key] for key in RISK_ORDER])[codes]
+        risk_levels = np.array([RISK_LEVELS[key] for key in RISK_ORDER])[codes]
+
+        return statuses, risk_levels
 
 
     def fuzzy_match_item(
         self, 
         vendor_item: str, 
         clinical_items: List[str],
-        scorer=fuzz.token_sort_ratio
+        scorer=None
     ) -> Tuple[str, int]:
         """
         Find the best fuzzy match for a vendor item in clinical logs.
@@ -67,32 +147,216 @@ class ReconciliationEngine:
         Args:
             vendor_item (str): Item description from vendor invoice
             clinical_items (List[str]): List of clinical item descriptions
-            scorer: Fuzzy matching scoring algorithm
+            scorer: Fuzzy matching scoring algorithm (defaults to the engine scorer)
 
         Returns:
             Tuple[str, int]: (best_match_string, confidence_score)
         """
-        # Normalize the vendor item
-        normalized_vendor = normalize_text(vendor_item)
-
-        # Normalize all clinical items
-        normalized_clinical = [normalize_text(item) for item in clinical_items]
-
-        # Perform fuzzy matching
+        # Perform fuzzy matching, normalizing inside RapidFuzz
         best_match = process.extractOne(
-            normalized_vendor,
-            normalized_clinical,
-            scorer=scorer
+            str(vendor_item),
+            [str(item) for item in clinical_items],
+            scorer=scorer or self.scorer,
+            processor=default_process,
+            score_cutoff=self._score_cutoff()
         )
 
         if best_match:
             # Return original clinical item and score
-            match_index = normalized_clinical.index(best_match[0])
-            return clinical_items[match_index], best_match[1]
+            _, match_score, match_index = best_match
+            return clinical_items[match_index], int(round(match_score))
         else:
             return "No Match Found", 0
 
 
+    def _score_cutoff(self) -> int:
+        """Score below which pairs are pruned; never above the match threshold."""
+        return min(SCORE_CUTOFF, self.match_threshold)
+
+
+    def _processed_clinical(self, clinical_items: List[str]) -> Tuple[str, ...]:
+        """
+        Return processed clinical descriptions from the shared catalog cache.
+
+        Args:
+            clinical_items (List[str]): Clinical item descriptions
+
+        Returns:
+            Tuple[str, ...]: Descriptions run through default_process
+        """
+        return _process_catalog(tuple(clinical_items))
+
+
+    def _best_matches(
+        self,
+        processed_vendor: List[str],
+        clinical_items: List[str]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the best clinical match for every vendor item.
+
+        Args:
+            processed_vendor (List[str]): Vendor item descriptions run through default_process
+            clinical_items (List[str]): Clinical item descriptions
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (best_clinical_index, best_score) per vendor item
+        """
+        processed_clinical = self._processed_clinical(clinical_items)
+
+        thread_count = os.cpu_count() if self.workers == -1 else self.workers
+        logger.info(f"Scoring with {thread_count} worker thread(s)")
+
+        if self.blocking:
+            logger.info(
+                f"Blocking enabled: each vendor item is scored against at most "
+                f"{BLOCKING_MAX_CANDIDATES} clinical items sharing "
+                f"{BLOCKING_MIN_SHARED_NGRAMS}+ {BLOCKING_NGRAM_SIZE}-character n-grams; "
+                f"per-item scoring is single-threaded"
+            )
+            return self._blocked_matches(processed_vendor, processed_clinical)
+
+        # Score the full vendor x clinical matrix
+        scores = process.cdist(
+            processed_vendor,
+            processed_clinical,
+            scorer=self.scorer,
+            processor=None,
+            score_cutoff=self._score_cutoff(),
+            dtype=np.uint8,
+            workers=self.workers
+        )
+
+        best_idx = scores.argmax(axis=1)
+        return best_idx, scores[np.arange(len(processed_vendor)), best_idx]
+
+
+    def _blocked_matches(
+        self,
+        processed_vendor: List[str],
+        processed_clinical: Tuple[str, ...]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score each vendor item only against its own blocked candidate set.
+
+        Candidates are clinical items sharing at least BLOCKING_MIN_SHARED_NGRAMS
+        selective character n-grams with the vendor item, capped at the
+        BLOCKING_MAX_CANDIDATES strongest overlaps. N-grams found in more than
+        BLOCKING_MAX_NGRAM_SHARE of a large catalog are ignored; items with no
+        selective n-gram are scored against the full catalog instead.
+
+        Args:
+            processed_vendor (List[str]): Processed vendor item descriptions
+            processed_clinical (Tuple[str, ...]): Processed clinical item descriptions
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (best_clinical_index, best_score) per vendor item
+        """
+        # Inverted index: n-gram -> clinical row indices containing it
+        postings = defaultdict(list)
+        for clinical_idx, text in enumerate(processed_clinical):
+            for ngram in _char_ngrams(text):
+                postings[ngram].append(clinical_idx)
+
+        # Small catalogs keep every n-gram; the share only prunes large ones
+        max_postings = max(BLOCKING_MAX_CANDIDATES, int(BLOCKING_MAX_NGRAM_SHARE * len(processed_clinical)))
+        ngram_index = {
+            ngram: np.asarray(rows, dtype=np.intp)
+            for ngram, rows in postings.items()
+            if len(rows) <= max_postings
+        }
+
+        best_idx = np.zeros(len(processed_vendor), dtype=np.intp)
+        best_scores = np.zeros(len(processed_vendor), dtype=np.uint8)
+        score_cutoff = self._score_cutoff()
+        unblocked_rows = []
+
+        for row, query in enumerate(processed_vendor):
+            query_postings = [ngram_index[ngram] for ngram in _char_ngrams(query) if ngram in ngram_index]
+
+            if not query_postings:
+                unblocked_rows.append(row)
+                continue
+
+            # Count shared n-grams per clinical row and keep the strongest overlaps
+            rows, shared = np.unique(np.concatenate(query_postings), return_counts=True)
+            keep = shared >= min(BLOCKING_MIN_SHARED_NGRAMS, len(query_postings))
+            rows, shared = rows[keep], shared[keep]
+
+            if len(rows) > BLOCKING_MAX_CANDIDATES:
+                strongest = np.argsort(-shared, kind="stable")[:BLOCKING_MAX_CANDIDATES]
+                rows = np.sort(rows[strongest])
+
+            if len(rows) == 0:
+                continue
+
+            best_match = process.extractOne(
+                query,
+                [processed_clinical[i] for i in rows],
+                scorer=self.scorer,
+                processor=None,
+                score_cutoff=score_cutoff
+            )
+
+            if best_match:
+                _, match_score, match_index = best_match
+                best_idx[row] = rows[match_index]
+                best_scores[row] = int(round(match_score))
+
+        if unblocked_rows:
+            # Nothing selective to block on; fall back to full-catalog scoring
+            logger.info(f"Blocking: {len(unblocked_rows)} vendor item(s) scored against the full catalog")
+            scores = process.cdist(
+                [processed_vendor[row] for row in unblocked_rows],
+                processed_clinical,
+                scorer=self.scorer,
+                processor=None,
+                score_cutoff=score_cutoff,
+                dtype=np.uint8,
+                workers=self.workers
+            )
+            fallback_best = scores.argmax(axis=1)
+            best_idx[unblocked_rows] = fallback_best
+            best_scores[unblocked_rows] = scores[np.arange(len(unblocked_rows)), fallback_best]
+
+        return best_idx, best_scores
+
+
+    def _exact_po_matches(
+        self,
+        po_numbers: np.ndarray,
+        df_clinical: pd.DataFrame
+    ) -> np.ndarray:
+        """
+        Look up invoices whose PO number appears as a clinical PO reference.
+
+        Args:
+            po_numbers (np.ndarray): Invoice PO numbers
+            df_clinical (pd.DataFrame): Clinical documentation data
+
+        Returns:
+            np.ndarray: Clinical row position per invoice, or -1 if no exact match
+        """
+        po_ref_column = CLINICAL_COLUMNS["po_ref"]
+        no_matches = np.full(len(po_numbers), -1, dtype=np.intp)
+        if po_ref_column not in df_clinical.columns:
+            return no_matches
+
+        # Only rows that actually document an item count as exact matches
+        po_refs = df_clinical[po_ref_column]
+        has_ref = (po_refs.notna() & df_clinical[CLINICAL_COLUMNS["clinical_item"]].notna()).to_numpy()
+        if not has_ref.any():
+            return no_matches
+
+        # First clinical row wins when a PO is referenced more than once
+        ref_index = pd.Index(po_refs[has_ref])
+        first_seen = ~ref_index.duplicated()
+        ref_positions = np.flatnonzero(has_ref)[first_seen]
+
+        hits = ref_index[first_seen].get_indexer(po_numbers)
+        return np.where(hits >= 0, ref_positions[hits], -1)
+
+
     def reconcile(
         self, 
         df_invoice: pd.DataFrame, 
@@ -134,35 +398,54 @@ class ReconciliationEngine:
         # Extract clinical descriptions
         clinical_descriptions = df_clinical[CLINICAL_COLUMNS["clinical_item"]].tolist()
 
-        # Process each invoice item
-        results = []
-
-        for index, row in df_invoice.iterrows():
-            vendor_item = row[INVOICE_COLUMNS["vendor_item"]]
+        # Pull invoice columns as arrays rather than iterating row Series
+        po_numbers = df_invoice[INVOICE_COLUMNS["po_number"]].to_numpy()
+        vendor_items = df_invoice[INVOICE_COLUMNS["vendor_item"]].to_numpy()
+        unit_costs = df_invoice[INVOICE_COLUMNS["unit_cost"]].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # Non-string cells (e.g. NaN) are cast to str as normalize_text did
+        inv_items = list(map(str, df_invoice[INVOICE_COLUMNS["vendor_item"]].tolist()))
+        clin_items = list(map(str, clinical_descriptions))
+
+        # Invoices whose PO is referenced in the clinical log are exact matches
+        best_idx = self._exact_po_matches(po_numbers, df_clinical)
+        best_scores = np.where(best_idx >= 0, 100, 0).astype(np.uint8)
+        residual = np.flatnonzero(best_idx < 0)
+        logger.info(f"Exact PO matches: {len(inv_items) - len(residual)}, fuzzy matching: {len(residual)}")
+
+        if len(residual) > 0:
+            # default_process lowercases and strips punctuation in C, matching
+            # normalize_text on ASCII input. Score each distinct normalized item
+            # once and broadcast back to every invoice.
+            processed_vendor = [default_process(inv_items[i]) for i in residual]
+            item_codes, unique_items = pd.factorize(pd.Series(processed_vendor, dtype=object))
+            unique_idx, unique_scores = self._best_matches(unique_items.tolist(), clin_items)
+            best_idx[residual] = unique_idx[item_codes]
+            best_scores[residual] = unique_scores[item_codes]
+
+        match_names = np.where(
+            best_scores > 0,
+            np.asarray(clinical_descriptions, dtype=object)[best_idx],
+            "No Match Found"
+        )
 
-            # Find best match
-            match_name, match_score = self.fuzzy_match_item(
-                vendor_item,
-                clinical_descriptions
+        # Classify risk as int8 codes and expand straight into categoricals
+        risk_codes = self.classify_risk_codes(best_scores)
+
+        # Compile results column-wise in one shot; display formatting is left to the UI
+        df_results = pd.DataFrame({
+            "PO_Number": po_numbers,
+            "Vendor_Item": vendor_items,
+            "Clinical_Match": match_names,
+            "Confidence_Score_Numeric": best_scores.astype(np.int64),
+            "Cost_At_Risk": unit_costs,
+            "Status": pd.Categorical.from_codes(
+                risk_codes, categories=[RISK_STATUSES[key] for key in RISK_ORDER]
+            ),
+            "Risk_Level": pd.Categorical.from_codes(
+                risk_codes, categories=[RISK_LEVELS[key] for key in RISK_ORDER]
             )
-
-            # Classify risk
-            status, risk_level = self.classify_risk(match_score)
-
-            # Compile result
-            results.append({
-                "PO_Number": row[INVOICE_COLUMNS["po_number"]],
-                "Vendor_Item": vendor_item,
-                "Clinical_Match": match_name,
-                "Confidence_Score": f"{match_score}%",
-                "Confidence_Score_Numeric": match_score,
-                "Unit_Cost": f"${row[INVOICE_COLUMNS['unit_cost']]:,.2f}",
-                "Cost_At_Risk": row[INVOICE_COLUMNS["unit_cost"]],
-                "Status": status,
-                "Risk_Level": risk_level
-            })
-
-        df_results = pd.DataFrame(results)
+        })
 
         logger.info(f"Reconciliation complete: {len(df_results)} items processed")
 
@@ -179,18 +462,19 @@ class ReconciliationEngine:
         Returns:
             Dict[str, Dict]: Summary statistics by risk level
         """
-        summary = {}
-
-        for risk_level in [RISK_LEVELS["HIGH"], RISK_LEVELS["MEDIUM"], RISK_LEVELS["LOW"]]:
-            filtered = df_results[df_results['Risk_Level'] == risk_level]
+        # Single grouped pass over the categorical risk level
+        aggregated = df_results.groupby('Risk_Level', observed=True)['Cost_At_Risk'].agg(
+            count='size',
+            total_amount='sum',
+            avg_amount='mean'
+        ).to_dict(orient='index')
 
-            summary[risk_level] = {
-                "count": len(filtered),
-                "total_amount": filtered['Cost_At_Risk'].sum(),
-                "avg_amount": filtered['Cost_At_Risk'].mean() if len(filtered) > 0 else 0
-            }
+        empty_stats = {"count": 0, "total_amount": 0.0, "avg_amount": 0.0}
 
-        return summary
+        return {
+            risk_level: aggregated.get(risk_level, dict(empty_stats))
+            for risk_level in [RISK_LEVELS["HIGH"], RISK_LEVELS["MEDIUM"], RISK_LEVELS["LOW"]]
+        }
 
 
 # Standalone function for quick reconciliation
@@ -210,8 +494,8 @@ def quick_reconcile(
     Returns:
         pd.DataFrame: Reconciliation results
     """
-    df_inv = pd.read_csv(invoice_path)
-    df_clin = pd.read_csv(clinical_path)
+    df_inv = read_csv(invoice_path)
+    df_clin = read_csv(clinical_path)
 
     engine = ReconciliationEngine(match_threshold=threshold)
     results = engine.reconcile(df_inv, df_clin)
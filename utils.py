@@ -2,6 +2,7 @@
 Utility functions for data preprocessing and validation.
 """
 
+import functools
 import pandas as pd
 import re
 from typing import Optional, Tuple
@@ -11,6 +12,10 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Precompiled patterns for normalize_text
+_NORM_RE = re.compile(r'[^a-z0-9\s]')
+_WS_RE = re.compile(r'\s+')
+
 
 def normalize_text(text: str) -> str:
     """
@@ -26,16 +31,30 @@ def normalize_text(text: str) -> str:
     if not isinstance(text, str):
         return str(text)
 
-    # Convert to lowercase
-    text = text.lower()
+    return _normalize_str(text)
+
 
-    # Remove special characters (keep alphanumeric and spaces)
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+@functools.lru_cache(maxsize=8192)
+def _normalize_str(text: str) -> str:
+    """Cached worker for normalize_text; item catalogs repeat heavily."""
+    # Convert to lowercase and remove special characters (keep alphanumeric and spaces)
+    text = _NORM_RE.sub(' ', text.lower())
 
     # Remove extra whitespace
-    text = ' '.join(text.split())
+    return _WS_RE.sub(' ', text).strip()
+
+
+def read_csv(source) -> pd.DataFrame:
+    """
+    Read a CSV with the pyarrow parser into arrow-backed columns.
 
-    return text
+    Args:
+        source: File path or file-like buffer
+
+    Returns:
+        pd.DataFrame: Parsed data with pyarrow dtypes
+    """
+    return pd.read_csv(source, engine='pyarrow', dtype_backend='pyarrow')
 
 
 def validate_dataframe(df: pd.DataFrame, required_columns: list) -> Tuple[bool, Optional[str]]: